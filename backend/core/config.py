@@ -1,6 +1,7 @@
 from pydantic_settings import BaseSettings
-from pydantic import Field
-from typing import List
+from pydantic import Field, model_validator
+from functools import cached_property
+from typing import Tuple
 import os
 
 
@@ -26,11 +27,31 @@ class Settings(BaseSettings):
         default="alerts_stream",
         description="Redis stream for alerts"
     )
+    REDIS_CONTROL_CHANNEL: str = Field(
+        default="ingestor_control",
+        description="Prefix of the per-worker pub/sub channels (<prefix>:<worker id>) for symbol add/remove"
+    )
+    REDIS_STREAM_MAXLEN: int = Field(
+        default=100000,
+        description="Approximate number of ticks retained in the Redis stream"
+    )
     
     # API
     API_HOST: str = Field(default="0.0.0.0", description="API host")
     API_PORT: int = Field(default=8000, description="API port")
     
+    # Workers
+    WORKER_COUNT: int = Field(
+        default=1,
+        ge=1,
+        description="Number of worker processes sharing the API port and symbols"
+    )
+    WORKER_ID: int = Field(
+        default=0,
+        ge=0,
+        description="Index of this worker (0..WORKER_COUNT-1)"
+    )
+    
     # WebSocket
     BINANCE_WS_URL: str = Field(
         default="wss://fstream.binance.com/ws",
@@ -40,16 +61,43 @@ class Settings(BaseSettings):
         default="btcusdt,ethusdt,bnbusdt",
         description="Comma-separated default symbols"
     )
+    PUBLISH_BATCH_SIZE: int = Field(
+        default=200,
+        description="Max ticks per pipelined XADD batch"
+    )
+    PUBLISH_BATCH_TIMEOUT_SECONDS: float = Field(
+        default=0.005,
+        description="Max seconds to wait for a publish batch to fill"
+    )
+    PUBLISH_QUEUE_MAXSIZE: int = Field(
+        default=1000,
+        description="Max ticks waiting to be published; newer ticks are dropped past this"
+    )
     
     # Batch Processing
     BATCH_SIZE: int = Field(
-        default=500,
+        default=5000,
         description="Number of ticks to batch before DB insert"
     )
+    MAX_BATCH_BYTES: int = Field(
+        default=196_608,
+        description=(
+            "Approximate insert payload size (bytes) that triggers a flush; "
+            "~47 bytes/row for typical symbols, so the default fires near 4k rows"
+        )
+    )
+    COPY_MIN_ROWS: int = Field(
+        default=2000,
+        description="Batches at least this large use binary COPY instead of UNNEST"
+    )
     BATCH_TIMEOUT_SECONDS: float = Field(
         default=1.0,
         description="Max seconds to wait before flushing batch"
     )
+    MAX_RETRY_ROWS: int = Field(
+        default=20000,
+        description="Max ticks held for retry while inserts fail; the oldest are dropped past this"
+    )
     
     # Analytics
     ROLLING_WINDOW_DEFAULT: int = Field(
@@ -72,15 +120,24 @@ class Settings(BaseSettings):
     ANALYTICS_CONSUMER_GROUP: str = "analytics_group"
     ALERT_CONSUMER_GROUP: str = "alert_group"
     
-    @property
-    def symbols_list(self) -> List[str]:
-        """Get symbols as list"""
-        return [s.strip().lower() for s in self.DEFAULT_SYMBOLS.split(",")]
+    @model_validator(mode="after")
+    def check_worker_id(self) -> "Settings":
+        """A worker outside 0..WORKER_COUNT-1 would own no symbols"""
+        if self.WORKER_ID >= self.WORKER_COUNT:
+            raise ValueError(
+                f"WORKER_ID ({self.WORKER_ID}) must be less than WORKER_COUNT ({self.WORKER_COUNT})"
+            )
+        return self
+    
+    @cached_property
+    def symbols_list(self) -> Tuple[str, ...]:
+        """Get symbols as tuple (parsed once)"""
+        return tuple(s.strip().lower() for s in self.DEFAULT_SYMBOLS.split(","))
     
-    @property
-    def intervals_list(self) -> List[str]:
-        """Get resample intervals as list"""
-        return [i.strip() for i in self.RESAMPLE_INTERVALS.split(",")]
+    @cached_property
+    def intervals_list(self) -> Tuple[str, ...]:
+        """Get resample intervals as tuple (parsed once)"""
+        return tuple(i.strip() for i in self.RESAMPLE_INTERVALS.split(","))
     
     class Config:
         env_file = ".env"
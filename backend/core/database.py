@@ -1,13 +1,127 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
-from sqlalchemy import Column, String, Float, Integer, Boolean, DateTime, Text, JSON
+from sqlalchemy import Column, String, Float, Integer, Boolean, DateTime, Text, JSON, text
 from sqlalchemy.dialects.postgresql import JSONB
-from datetime import datetime
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import List, Optional, Tuple
 from .config import settings
+import asyncpg
 import logging
+import struct
 
 logger = logging.getLogger(__name__)
 
+# Raw asyncpg pool for the tick write path
+pg_pool: Optional[asyncpg.Pool] = None
+
+# Hot-path statement kept constant so asyncpg's statement cache reuses the plan;
+# one round trip per batch with columns sent as binary arrays
+INSERT_TICKS_SQL = """
+    INSERT INTO ticks (time, symbol, price, size)
+    SELECT * FROM UNNEST($1::timestamptz[], $2::text[], $3::float8[], $4::float8[])
+    ON CONFLICT (time, symbol) DO NOTHING
+"""
+
+# Postgres timestamps are int64 microseconds since 2000-01-01 UTC
+PG_EPOCH_OFFSET_US = 946_684_800_000_000
+_int64 = struct.Struct(">q")
+
+
+def _encode_timestamptz(epoch_us: int) -> bytes:
+    """Encode unix epoch microseconds as a binary TIMESTAMPTZ"""
+    return _int64.pack(epoch_us - PG_EPOCH_OFFSET_US)
+
+
+def _decode_timestamptz(data: bytes) -> int:
+    """Decode a binary TIMESTAMPTZ to unix epoch microseconds"""
+    return _int64.unpack(data)[0] + PG_EPOCH_OFFSET_US
+
+
+# Large batches skip UNNEST and go through binary COPY into a staging table
+TICK_COLUMNS = ("time", "symbol", "price", "size")
+
+CREATE_TICKS_STAGING_SQL = """
+    CREATE TEMP TABLE IF NOT EXISTS ticks_staging
+    (LIKE ticks INCLUDING DEFAULTS)
+    ON COMMIT DELETE ROWS
+"""
+
+MERGE_TICKS_STAGING_SQL = """
+    INSERT INTO ticks (time, symbol, price, size)
+    SELECT time, symbol, price, size FROM ticks_staging
+    ON CONFLICT (time, symbol) DO NOTHING
+"""
+
+# Binary COPY framing: signature, flags, header extension length / end-of-data marker
+COPY_BINARY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)
+COPY_BINARY_TRAILER = struct.pack(">h", -1)
+
+
+@lru_cache(maxsize=None)
+def _copy_row_packer(symbol: str) -> Tuple[struct.Struct, bytes]:
+    """Pre-compiled packer for one (time, symbol, price, size) COPY row of a given symbol"""
+    symbol_bytes = symbol.encode()
+    # field count, then (length, value) per column: int8 time, text symbol, float8 price/size
+    return struct.Struct(f">hiqi{len(symbol_bytes)}sidid"), symbol_bytes
+
+
+def encode_ticks_copy_binary(
+    times_us: List[int],
+    symbols: List[str],
+    prices: List[float],
+    sizes: List[float]
+) -> bytearray:
+    """Encode column-oriented ticks as a complete binary COPY payload"""
+    packers = [_copy_row_packer(symbol) for symbol in symbols]
+    total = len(COPY_BINARY_HEADER) + sum(p.size for p, _ in packers) + len(COPY_BINARY_TRAILER)
+    
+    buf = bytearray(total)
+    buf[:len(COPY_BINARY_HEADER)] = COPY_BINARY_HEADER
+    offset = len(COPY_BINARY_HEADER)
+    for (packer, symbol_bytes), us, price, size in zip(packers, times_us, prices, sizes):
+        packer.pack_into(
+            buf, offset,
+            4,
+            8, us - PG_EPOCH_OFFSET_US,
+            len(symbol_bytes), symbol_bytes,
+            8, price,
+            8, size,
+        )
+        offset += packer.size
+    buf[offset:] = COPY_BINARY_TRAILER
+    # Handed to COPY as-is; bytes(buf) would copy the whole payload again
+    return buf
+
+
+# Continuous aggregates defined in scripts/init_db.sql: interval -> (view, start_offset, end_offset);
+# the policy offsets here are authoritative and re-applied on startup
+OHLCV_VIEWS = {
+    "1s": ("ohlcv_1s", timedelta(hours=1), timedelta(seconds=1)),
+    "1m": ("ohlcv_1m", timedelta(hours=2), timedelta(minutes=1)),
+    "5m": ("ohlcv_5m", timedelta(hours=6), timedelta(minutes=5)),
+}
+
+# Read queries; view names are interpolated once from the allowlist, values stay parameters
+LATEST_TICKS_SQL = """
+    SELECT time, symbol, price, size
+    FROM ticks
+    WHERE symbol = $1
+    ORDER BY time DESC
+    LIMIT $2
+"""
+
+OHLCV_SQL = {
+    interval: f"""
+    SELECT time, symbol, open, high, low, close, volume, trade_count
+    FROM {view_name}
+    WHERE symbol = $1
+    ORDER BY time DESC
+    LIMIT $2
+"""
+    for interval, (view_name, _, _) in OHLCV_VIEWS.items()
+}
+
 # Convert postgresql:// to postgresql+asyncpg://
 db_url = settings.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://")
 
@@ -64,7 +178,7 @@ class Analytics(Base):
     symbol2 = Column(String, primary_key=True, default="")
     metric_type = Column(String, primary_key=True)
     value = Column(Float)
-    metadata = Column(JSONB)
+    metadata_ = Column("metadata", JSONB)  # "metadata" is reserved by Declarative
 
 
 class Alert(Base):
@@ -89,21 +203,80 @@ class AlertHistory(Base):
     time = Column(DateTime(timezone=True), primary_key=True)
     alert_id = Column(Integer, primary_key=True)
     value = Column(Float, nullable=False)
-    metadata = Column(JSONB)
+    metadata_ = Column("metadata", JSONB)  # "metadata" is reserved by Declarative
+
+
+async def _init_pg_connection(conn: asyncpg.Connection):
+    """Register pooled-connection codecs and the COPY staging table"""
+    # TIMESTAMPTZ travels as int epoch microseconds, so no datetime is ever built
+    await conn.set_type_codec(
+        "timestamptz",
+        encoder=_encode_timestamptz,
+        decoder=_decode_timestamptz,
+        schema="pg_catalog",
+        format="binary",
+    )
+    # Session-local staging table so COPY can be combined with ON CONFLICT
+    await conn.execute(CREATE_TICKS_STAGING_SQL)
 
 
 async def init_db():
     """Initialize database connection"""
+    global pg_pool
     try:
         async with engine.begin() as conn:
             # Test connection
             await conn.execute(text("SELECT 1"))
+        
+        pg_pool = await asyncpg.create_pool(
+            settings.DATABASE_URL,
+            min_size=4,
+            max_size=20,
+            init=_init_pg_connection,
+        )
         logger.info("Database connection established")
+        
+        # Policies are cluster-wide; one worker is enough to apply them
+        if settings.WORKER_ID == 0:
+            await configure_aggregate_policies()
     except Exception as e:
         logger.error(f"Database connection failed: {e}")
         raise
 
 
+async def configure_aggregate_policies():
+    """Align continuous aggregate refresh policies with the alert cadence"""
+    # OHLCV is computed incrementally by TimescaleDB; recent buckets are served
+    # live (materialized_only = false), so refreshing faster than a view's bucket
+    # width buys nothing. end_offset is one bucket for every view.
+    alert_window = timedelta(seconds=settings.ALERT_CHECK_INTERVAL * 2)
+    
+    async with pg_pool.acquire() as conn:
+        for view_name, start_offset, end_offset in OHLCV_VIEWS.values():
+            schedule = max(end_offset, alert_window)
+            try:
+                async with conn.transaction():
+                    await conn.execute(
+                        "SELECT remove_continuous_aggregate_policy($1::text::regclass, if_exists => TRUE)",
+                        view_name,
+                    )
+                    await conn.execute(
+                        """
+                        SELECT add_continuous_aggregate_policy($1::text::regclass,
+                            start_offset => $2::interval,
+                            end_offset => $3::interval,
+                            schedule_interval => $4::interval)
+                        """,
+                        view_name, start_offset, end_offset, schedule,
+                    )
+            except asyncpg.PostgresError as e:
+                # Not the view owner, view missing, or an older TimescaleDB API:
+                # keep whatever policy init_db.sql installed and start anyway
+                logger.warning(f"Cannot update refresh policy for {view_name}: {e}")
+                continue
+            logger.info(f"{view_name} refresh every {schedule.total_seconds()}s")
+
+
 async def get_session() -> AsyncSession:
     """Get async database session"""
     async with async_session_maker() as session:
@@ -117,68 +290,65 @@ async def get_session() -> AsyncSession:
             await session.close()
 
 
-from sqlalchemy import text
-
-async def bulk_insert_ticks(ticks: list):
-    """Bulk insert ticks efficiently"""
-    if not ticks:
+async def bulk_insert_ticks(
+    times_us: List[int],
+    symbols: List[str],
+    prices: List[float],
+    sizes: List[float]
+):
+    """Bulk insert column-oriented ticks (UNNEST, or binary COPY for large batches)"""
+    # Errors propagate unlogged: the caller reports them and keeps the batch for retry
+    if not times_us:
         return
     
-    async with async_session_maker() as session:
-        try:
-            # Prepare values for bulk insert
-            values = []
-            for tick in ticks:
-                values.append(f"('{tick['time']}', '{tick['symbol']}', {tick['price']}, {tick['size']})")
-            
-            query = f"""
-                INSERT INTO ticks (time, symbol, price, size)
-                VALUES {','.join(values)}
-                ON CONFLICT (time, symbol) DO NOTHING
-            """
-            
-            await session.execute(text(query))
-            await session.commit()
-            logger.debug(f"Inserted {len(ticks)} ticks")
-        except Exception as e:
-            logger.error(f"Bulk insert failed: {e}")
-            await session.rollback()
+    if len(times_us) >= settings.COPY_MIN_ROWS:
+        # Pre-encoded payload bypasses asyncpg's per-record conversion
+        payload = encode_ticks_copy_binary(times_us, symbols, prices, sizes)
+        await _copy_ticks(payload)
+    else:
+        # Pool-level execute: no ORM session or unit-of-work on the write path;
+        # times are epoch microseconds, which the pool's TIMESTAMPTZ codec takes as-is
+        await pg_pool.execute(INSERT_TICKS_SQL, times_us, symbols, prices, sizes)
+    logger.debug(f"Inserted {len(times_us)} ticks")
 
 
-async def get_latest_ticks(symbol: str, limit: int = 1000):
-    """Get latest ticks for a symbol"""
-    async with async_session_maker() as session:
-        query = text("""
-            SELECT time, symbol, price, size
-            FROM ticks
-            WHERE symbol = :symbol
-            ORDER BY time DESC
-            LIMIT :limit
-        """)
-        result = await session.execute(query, {"symbol": symbol, "limit": limit})
-        return result.fetchall()
-
-
-async def get_ohlcv_data(symbol: str, interval: str, limit: int = 1000):
-    """Get OHLCV data for analysis"""
-    async with async_session_maker() as session:
-        # Query the continuous aggregate views
-        view_name = f"ohlcv_{interval}"
-        query = text(f"""
-            SELECT time, symbol, open, high, low, close, volume, trade_count
-            FROM {view_name}
-            WHERE symbol = :symbol
-            ORDER BY time DESC
-            LIMIT :limit
-        """)
-        result = await session.execute(query, {"symbol": symbol, "limit": limit})
-        return result.fetchall()
+async def _copy_ticks(payload: bytearray):
+    """COPY a binary payload into staging and merge it into ticks"""
+    async def chunks():
+        yield payload
+    
+    async with pg_pool.acquire() as conn, conn.transaction():
+        await conn.copy_to_table(
+            "ticks_staging",
+            source=chunks(),
+            columns=TICK_COLUMNS,
+            format="binary",
+        )
+        await conn.execute(MERGE_TICKS_STAGING_SQL)
+
+
+async def get_latest_ticks(symbol: str, limit: int = 1000) -> List[asyncpg.Record]:
+    """Get latest ticks for a symbol (time as epoch microseconds)"""
+    return await pg_pool.fetch(LATEST_TICKS_SQL, symbol, limit)
+
+
+async def get_ohlcv_data(symbol: str, interval: str, limit: int = 1000) -> List[asyncpg.Record]:
+    """Get OHLCV data for analysis (time as epoch microseconds)"""
+    if interval not in OHLCV_SQL:
+        raise ValueError(f"Unsupported interval: {interval}")
+    
+    # Query the continuous aggregate views
+    return await pg_pool.fetch(OHLCV_SQL[interval], symbol, limit)
 
 
 async def store_analytics(analytics_data: dict):
     """Store computed analytics"""
     async with async_session_maker() as session:
         try:
+            # Callers pass the column name; the mapped attribute is metadata_
+            if "metadata" in analytics_data:
+                analytics_data = dict(analytics_data)
+                analytics_data["metadata_"] = analytics_data.pop("metadata")
             analytic = Analytics(**analytics_data)
             session.add(analytic)
             await session.commit()
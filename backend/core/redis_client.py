@@ -1,6 +1,6 @@
 import redis.asyncio as aioredis
 from .config import settings
-import json
+import orjson
 import logging
 from typing import Dict, List, Optional
 
@@ -9,6 +9,21 @@ logger = logging.getLogger(__name__)
 # Global Redis client
 redis_client: Optional[aioredis.Redis] = None
 
+# Analytics payloads carry numpy scalars/arrays and non-str keys (e.g. int windows)
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _orjson_default(obj):
+    """Fallback for float subclasses orjson rejects (int subclasses are native)"""
+    if isinstance(obj, float):
+        return float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps_json(value) -> bytes:
+    """Serialize to JSON with the options json.dumps callers relied on"""
+    return orjson.dumps(value, default=_orjson_default, option=ORJSON_OPTIONS)
+
 
 async def init_redis():
     """Initialize Redis connection"""
@@ -59,11 +74,12 @@ async def publish_tick(tick: Dict):
             settings.REDIS_STREAM_NAME,
             {
                 "symbol": tick["symbol"],
-                "time": tick["time"],
-                "price": str(tick["price"]),
-                "size": str(tick["size"])
+                "time_ms": tick["time_ms"],
+                "price": tick["price"],
+                "size": tick["size"]
             },
-            maxlen=100000  # Keep last 100k ticks in stream
+            maxlen=settings.REDIS_STREAM_MAXLEN,  # Keep roughly the last N ticks in stream
+            approximate=True
         )
         return message_id
     except Exception as e:
@@ -71,6 +87,40 @@ async def publish_tick(tick: Dict):
         return None
 
 
+async def publish_ticks(ticks: List[Dict]) -> List[Dict]:
+    """Publish a batch of ticks to Redis stream in one pipelined round trip; returns failed ticks"""
+    if not ticks:
+        return []
+    
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for tick in ticks:
+                pipe.xadd(
+                    settings.REDIS_STREAM_NAME,
+                    {
+                        "symbol": tick["symbol"],
+                        "time_ms": tick["time_ms"],
+                        "price": tick["price"],
+                        "size": tick["size"]
+                    },
+                    maxlen=settings.REDIS_STREAM_MAXLEN,
+                    approximate=True  # MAXLEN ~ trims whole nodes, avoiding O(n) trimming
+                )
+            # Per-command errors come back in place, so successes are still counted
+            results = await pipe.execute(raise_on_error=False)
+    except Exception as e:
+        # Connection-level failure: treat the whole batch as unpublished
+        # (a retry may duplicate entries; the ticks insert ignores conflicts)
+        logger.error(f"Failed to publish {len(ticks)} ticks: {e}")
+        return list(ticks)
+    
+    failed = [tick for tick, result in zip(ticks, results) if isinstance(result, Exception)]
+    if failed:
+        first_error = next(r for r in results if isinstance(r, Exception))
+        logger.error(f"Failed to publish {len(failed)}/{len(ticks)} ticks: {first_error}")
+    return failed
+
+
 async def publish_alert(alert: Dict):
     """Publish alert to Redis alert stream"""
     try:
@@ -92,15 +142,23 @@ async def publish_alert(alert: Dict):
         return None
 
 
-async def consume_ticks(consumer_group: str, consumer_name: str, count: int = 10, block: int = 1000):
+async def consume_ticks(
+    consumer_group: str,
+    consumer_name: str,
+    count: int = 10,
+    block: int = 1000,
+    noack: bool = False
+):
     """Consume tick data from Redis stream"""
     try:
+        # noack=True skips the pending entries list, so no XACK is needed
         messages = await redis_client.xreadgroup(
             groupname=consumer_group,
             consumername=consumer_name,
             streams={settings.REDIS_STREAM_NAME: ">"},
             count=count,
-            block=block
+            block=block,
+            noack=noack
         )
         
         ticks = []
@@ -111,7 +169,7 @@ async def consume_ticks(consumer_group: str, consumer_name: str, count: int = 10
                 message_ids.append(message_id)
                 ticks.append({
                     "symbol": data["symbol"],
-                    "time": data["time"],
+                    "time_ms": int(data["time_ms"]),
                     "price": float(data["price"]),
                     "size": float(data["size"])
                 })
@@ -155,7 +213,7 @@ async def get_stream_info():
 async def set_cache(key: str, value: any, expiry: int = 300):
     """Set cache value with expiry"""
     try:
-        await redis_client.setex(key, expiry, json.dumps(value))
+        await redis_client.setex(key, expiry, dumps_json(value))
     except Exception as e:
         logger.error(f"Failed to set cache: {e}")
 
@@ -165,19 +223,20 @@ async def get_cache(key: str):
     try:
         value = await redis_client.get(key)
         if value:
-            return json.loads(value)
+            return orjson.loads(value)
         return None
     except Exception as e:
         logger.error(f"Failed to get cache: {e}")
         return None
 
 
-async def publish_to_channel(channel: str, message: Dict):
-    """Publish message to Redis pub/sub channel"""
+async def publish_to_channel(channel: str, message: Dict) -> int:
+    """Publish message to Redis pub/sub channel; returns the number of receivers"""
     try:
-        await redis_client.publish(channel, json.dumps(message))
+        return await redis_client.publish(channel, dumps_json(message))
     except Exception as e:
         logger.error(f"Failed to publish to channel: {e}")
+        return 0
 
 
 def get_redis_client() -> aioredis.Redis:
@@ -1,33 +1,137 @@
 import asyncio
-from typing import List
+import time
+from typing import List, Optional
 import logging
 from datetime import datetime
 
+import numpy as np
+
 from backend.core.config import settings
-from backend.core.redis_client import consume_ticks, acknowledge_messages
+from backend.core.redis_client import consume_ticks
 from backend.core.database import bulk_insert_ticks
 
 logger = logging.getLogger(__name__)
 
+# Binary array encoding per tick: 4 length words + time/price/size (symbol added per tick)
+ROW_OVERHEAD_BYTES = 4 * 4 + 8 + 8 + 8
+
+
+class TickBuffer:
+    """Column-oriented (SoA) tick buffer backed by preallocated numpy arrays"""
+    
+    def __init__(self, capacity: int):
+        self.times = np.empty(capacity, dtype=np.int64)  # epoch ms
+        self.symbols = np.empty(capacity, dtype=object)
+        self.prices = np.empty(capacity, dtype=np.float64)
+        self.sizes = np.empty(capacity, dtype=np.float64)
+        self.n = 0
+        self.nbytes = 0
+    
+    def __len__(self) -> int:
+        return self.n
+    
+    def reserve(self, capacity: int):
+        """Grow the arrays (doubling) so at least `capacity` rows fit"""
+        if capacity <= len(self.times):
+            return
+        new_capacity = max(capacity, 2 * len(self.times))
+        for name in ("times", "symbols", "prices", "sizes"):
+            old = getattr(self, name)
+            new = np.empty(new_capacity, dtype=old.dtype)
+            new[:self.n] = old[:self.n]
+            setattr(self, name, new)
+    
+    def extend(self, ticks: List[dict]):
+        """Append consumed ticks column by column"""
+        n, nbytes = self.n, self.nbytes
+        self.reserve(n + len(ticks))
+        times, symbols, prices, sizes = self.times, self.symbols, self.prices, self.sizes
+        for tick in ticks:
+            symbol = tick["symbol"]
+            times[n] = tick["time_ms"]
+            symbols[n] = symbol
+            prices[n] = tick["price"]
+            sizes[n] = tick["size"]
+            nbytes += ROW_OVERHEAD_BYTES + len(symbol)
+            n += 1
+        self.n, self.nbytes = n, nbytes
+    
+    def prepend(self, other: "TickBuffer", start: int = 0):
+        """Insert another buffer's rows from `start` on ahead of this one's (retry path)"""
+        count = other.n - start
+        total = count + self.n
+        self.reserve(total)
+        for name in ("times", "symbols", "prices", "sizes"):
+            col = getattr(self, name)
+            col[count:total] = col[:self.n].copy()
+            col[:count] = getattr(other, name)[start:other.n]
+        self.n = total
+        self.nbytes += other.nbytes if start == 0 else other.rows_nbytes(start, other.n)
+    
+    def truncate(self, n: int):
+        """Keep only the first n rows"""
+        self.nbytes -= self.rows_nbytes(n, self.n)
+        self.symbols[n:self.n] = None
+        self.n = n
+    
+    def drop_front(self, count: int):
+        """Discard the oldest `count` rows"""
+        self.nbytes -= self.rows_nbytes(0, count)
+        remaining = self.n - count
+        for name in ("times", "symbols", "prices", "sizes"):
+            col = getattr(self, name)
+            col[:remaining] = col[count:self.n].copy()
+        self.symbols[remaining:self.n] = None
+        self.n = remaining
+    
+    def rows_nbytes(self, start: int, end: int) -> int:
+        """Estimated encoded size of rows [start, end)"""
+        return (end - start) * ROW_OVERHEAD_BYTES + sum(len(s) for s in self.symbols[start:end])
+    
+    def columns(self) -> tuple:
+        """Filled slices of each column, converted once for the driver (times in epoch µs)"""
+        n = self.n
+        return (
+            (self.times[:n] * 1000).tolist(),  # ms -> µs in one vectorized pass
+            self.symbols[:n].tolist(),
+            self.prices[:n].tolist(),
+            self.sizes[:n].tolist(),
+        )
+    
+    def clear(self):
+        """Reset for reuse without reallocating"""
+        self.symbols[:self.n] = None  # drop symbol references
+        self.n = 0
+        self.nbytes = 0
+
 
 class BatchProcessor:
     """Process ticks in batches to avoid DB bombardment"""
     
     def __init__(self):
-        self.consumer_name = f"batch_processor_{datetime.now().timestamp()}"
-        self.buffer = []
+        self.consumer_name = f"batch_processor_{settings.WORKER_ID}_{datetime.now().timestamp()}"
+        # Double-buffered: one TickBuffer fills while the other is inserted
+        self.buffer_capacity = settings.BATCH_SIZE + 100  # headroom for one extra read
+        self.buffer = TickBuffer(self.buffer_capacity)
+        self.spare_buffer: Optional[TickBuffer] = TickBuffer(self.buffer_capacity)
+        self.inflight: Optional[asyncio.Task] = None
+        self.flush_lock = asyncio.Lock()
         self.running = False
         self.stats = {
             "batches_processed": 0,
             "ticks_inserted": 0,
+            "ticks_dropped": 0,
             "errors": 0
         }
-        self.last_flush = datetime.now()
+        self.last_flush = time.monotonic()
     
     async def start(self):
         """Start batch processing"""
         self.running = True
-        logger.info(f"Starting Batch Processor (batch_size={settings.BATCH_SIZE})")
+        logger.info(
+            f"Starting Batch Processor (batch_size={settings.BATCH_SIZE}, "
+            f"max_batch_bytes={settings.MAX_BATCH_BYTES})"
+        )
         
         # Run both consumer and flush tasks
         await asyncio.gather(
@@ -37,29 +141,31 @@ class BatchProcessor:
             return_exceptions=True
         )
     
+    def should_flush(self) -> bool:
+        """Check whether the buffer has hit a row-count or size trigger"""
+        return (
+            len(self.buffer) >= settings.BATCH_SIZE
+            or self.buffer.nbytes >= settings.MAX_BATCH_BYTES
+        )
+    
     async def consume_loop(self):
         """Continuously consume from Redis stream"""
         while self.running:
             try:
                 # Consume messages from Redis stream
-                ticks, message_ids = await consume_ticks(
+                ticks, _ = await consume_ticks(
                     consumer_group=settings.INGESTOR_CONSUMER_GROUP,
                     consumer_name=self.consumer_name,
                     count=100,  # Read up to 100 messages at a time
-                    block=1000  # Block for 1 second max
+                    block=1000,  # Block for 1 second max
+                    noack=True  # Delivery is the ack; skips the XACK round trip
                 )
                 
                 if ticks:
                     self.buffer.extend(ticks)
                     
-                    # Acknowledge messages immediately after buffering
-                    await acknowledge_messages(
-                        settings.INGESTOR_CONSUMER_GROUP,
-                        message_ids
-                    )
-                    
-                    # Flush if buffer is full
-                    if len(self.buffer) >= settings.BATCH_SIZE:
+                    # Hand off the batch; consuming resumes while the insert runs
+                    if self.should_flush():
                         await self.flush_buffer()
                 
             except Exception as e:
@@ -72,36 +178,69 @@ class BatchProcessor:
         while self.running:
             await asyncio.sleep(settings.BATCH_TIMEOUT_SECONDS)
             
-            # Flush if buffer has data and timeout exceeded
-            time_since_flush = (datetime.now() - self.last_flush).total_seconds()
+            # Flush if buffer has data and timeout exceeded (monotonic: immune to clock jumps)
+            time_since_flush = time.monotonic() - self.last_flush
             if self.buffer and time_since_flush >= settings.BATCH_TIMEOUT_SECONDS:
                 await self.flush_buffer()
     
     async def flush_buffer(self):
-        """Flush buffered ticks to database"""
-        if not self.buffer:
-            return
-        
-        try:
-            # Take current buffer and clear it
-            ticks_to_insert = self.buffer.copy()
-            self.buffer.clear()
+        """Submit buffered ticks for insert, keeping at most one batch inflight"""
+        async with self.flush_lock:
+            if not self.buffer:
+                return
+            
+            # Only one insert runs at a time; the next batch fills meanwhile
+            if self.inflight is not None:
+                await asyncio.wait([self.inflight])
+            
+            # Swap in the spare buffer; the filled one is handed to the insert
+            ticks_to_insert = self.buffer
+            # An empty TickBuffer is falsy, so test for None explicitly
+            if self.spare_buffer is not None:
+                self.buffer = self.spare_buffer
+            else:
+                self.buffer = TickBuffer(self.buffer_capacity)
+            self.spare_buffer = None
+            self.last_flush = time.monotonic()
+            
+            # A retried backlog goes out one BATCH_SIZE chunk at a time
+            if len(ticks_to_insert) > settings.BATCH_SIZE:
+                self.buffer.prepend(ticks_to_insert, start=settings.BATCH_SIZE)
+                ticks_to_insert.truncate(settings.BATCH_SIZE)
             
+            self.inflight = asyncio.create_task(self.insert_batch(ticks_to_insert))
+    
+    async def insert_batch(self, ticks_to_insert: TickBuffer) -> bool:
+        """Insert a snapshotted batch into the database; False if it was requeued"""
+        inserted = False
+        try:
             # Bulk insert to TimescaleDB
-            await bulk_insert_ticks(ticks_to_insert)
+            await bulk_insert_ticks(*ticks_to_insert.columns())
             
             # Update stats
             self.stats["batches_processed"] += 1
             self.stats["ticks_inserted"] += len(ticks_to_insert)
-            self.last_flush = datetime.now()
             
             logger.debug(f"Flushed batch of {len(ticks_to_insert)} ticks")
+            inserted = True
             
         except Exception as e:
             logger.error(f"Failed to flush buffer: {e}")
             self.stats["errors"] += 1
-            # Put ticks back in buffer on failure
-            self.buffer.extend(ticks_to_insert)
+            # Put ticks back at the front of the buffer so time order is kept
+            self.buffer.prepend(ticks_to_insert)
+            
+            # Bound memory during an outage: drop the oldest rows past the cap
+            overflow = len(self.buffer) - settings.MAX_RETRY_ROWS
+            if overflow > 0:
+                self.buffer.drop_front(overflow)
+                self.stats["ticks_dropped"] += overflow
+                logger.warning(f"Dropped {overflow} ticks over MAX_RETRY_ROWS")
+        
+        # Recycle the arrays for the next swap
+        ticks_to_insert.clear()
+        self.spare_buffer = ticks_to_insert
+        return inserted
     
     async def report_stats(self):
         """Periodically report processing statistics"""
@@ -117,13 +256,28 @@ class BatchProcessor:
     async def stop(self):
         """Stop processor and flush remaining data"""
         self.running = False
-        if self.buffer:
+        if self.inflight is not None:
+            await asyncio.wait([self.inflight])
+        
+        # Each flush sends at most BATCH_SIZE rows; drain until empty or an insert fails
+        while self.buffer:
             await self.flush_buffer()
+            await asyncio.wait([self.inflight])
+            if not self.inflight.result():
+                break
+        
+        if self.buffer:
+            dropped = len(self.buffer)
+            self.stats["ticks_dropped"] += dropped
+            self.buffer.clear()
+            logger.warning(f"Dropped {dropped} unflushed ticks on stop")
         logger.info("Batch Processor stopped")
     
     def get_stats(self) -> dict:
         """Get current statistics"""
         return {
             **self.stats,
-            "buffer_size": len(self.buffer)
+            "buffer_size": len(self.buffer),
+            "buffer_bytes": self.buffer.nbytes,
+            "inflight": self.inflight is not None and not self.inflight.done()
         }
\ No newline at end of file
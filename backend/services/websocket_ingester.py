@@ -1,99 +1,239 @@
 import asyncio
+import ssl
 import websockets
-import json
-from datetime import datetime
-from typing import Set
+import msgspec
+import zlib
+from typing import List, Optional, Set, Union
 import logging
 
 from backend.core.config import settings
-from backend.core.redis_client import publish_tick
+from backend.core.redis_client import get_redis_client, publish_ticks, publish_to_channel
 
 logger = logging.getLogger(__name__)
 
 
+class Trade(msgspec.Struct):
+    """Binance trade event; a frame missing any field fails to decode"""
+    e: str  # event type
+    T: int  # trade time (ms)
+    s: str  # symbol
+    p: float  # price
+    q: float  # quantity
+
+
+class StreamFrame(msgspec.Struct):
+    """Combined-stream envelope: {"stream": "<symbol>@trade", "data": {...}}"""
+    stream: str = ""
+    data: Optional[Trade] = None  # absent on SUBSCRIBE/UNSUBSCRIBE responses
+
+
+# Queued by stop() so publish_loop flushes everything ahead of it and exits
+PUBLISH_STOP = object()
+
+# Built once and shared across reconnects instead of reloading the CA store each time
+ssl_context = ssl.create_default_context()
+
+
+# strict=False lets msgspec parse Binance's quoted decimals straight into floats
+frame_decoder = msgspec.json.Decoder(StreamFrame, strict=False)
+
+
+def symbol_worker(symbol: str, worker_count: int) -> int:
+    """Worker index that owns a symbol"""
+    # crc32 rather than hash(): str hashes are salted per process
+    return zlib.crc32(symbol.encode()) % worker_count
+
+
+def control_channel(worker_id: int) -> str:
+    """Pub/sub channel only the given worker subscribes to"""
+    return f"{settings.REDIS_CONTROL_CHANNEL}:{worker_id}"
+
+
 class WebSocketIngestor:
     """Ingest real-time tick data from Binance WebSocket"""
     
     def __init__(self):
-        self.active_symbols: Set[str] = set(settings.symbols_list)
-        self.connections = {}
+        self.active_symbols: Set[str] = {
+            s for s in settings.symbols_list if self.owns_symbol(s)
+        }
+        self.connection = None
+        self.request_id = 0
+        # Bounded so a slow Redis cannot grow memory without limit
+        self.publish_queue: asyncio.Queue = asyncio.Queue(maxsize=settings.PUBLISH_QUEUE_MAXSIZE)
+        self.publish_task: Optional[asyncio.Task] = None
+        self.publish_retry: List[dict] = []  # failed ticks, sent ahead of the next batch
         self.running = False
         self.stats = {
             "ticks_received": 0,
             "ticks_published": 0,
+            "ticks_dropped": 0,
             "errors": 0
         }
     
+    def owns_symbol(self, symbol: str) -> bool:
+        """Check whether this worker's partition includes the symbol"""
+        return symbol_worker(symbol, settings.WORKER_COUNT) == settings.WORKER_ID
+    
     async def start(self):
         """Start ingesting data for all symbols"""
         self.running = True
         logger.info(f"Starting WebSocket Ingestor for symbols: {self.active_symbols}")
         
-        # Create tasks for each symbol
-        tasks = [
-            self.ingest_symbol(symbol)
-            for symbol in self.active_symbols
-        ]
+        # One combined-stream connection carries every symbol
+        tasks = [self.ingest_combined()]
+        
+        # Single publisher drains the queue into pipelined XADD batches
+        self.publish_task = asyncio.create_task(self.publish_loop())
+        tasks.append(self.publish_task)
+        
+        # Other workers forward add/remove requests for symbols this one owns
+        if settings.WORKER_COUNT > 1:
+            tasks.append(self.control_loop())
         
         # Also start stats reporter
         tasks.append(self.report_stats())
         
         await asyncio.gather(*tasks, return_exceptions=True)
     
-    async def ingest_symbol(self, symbol: str):
-        """Ingest data for a single symbol"""
-        url = f"{settings.BINANCE_WS_URL}/{symbol}@trade"
-        
+    def combined_stream_url(self) -> str:
+        """Build the combined-stream URL for the currently active symbols"""
+        base = settings.BINANCE_WS_URL
+        if base.endswith("/ws"):
+            base = base[:-len("/ws")]
+        url = f"{base}/stream"
+        if self.active_symbols:
+            url += "?streams=" + "/".join(f"{s}@trade" for s in sorted(self.active_symbols))
+        return url
+    
+    async def ingest_combined(self):
+        """Ingest data for all symbols over a single combined stream"""
         while self.running:
             try:
-                async with websockets.connect(url) as ws:
-                    logger.info(f"✅ Connected to {symbol} stream")
-                    self.connections[symbol] = ws
+                # Rebuilt on every reconnect so symbols added at runtime are kept
+                url = self.combined_stream_url()
+                
+                # Trade frames are tiny, so per-message deflate costs more than it saves
+                async with websockets.connect(
+                    url,
+                    ssl=ssl_context if url.startswith("wss://") else None,
+                    open_timeout=5,
+                    compression=None,
+                    max_size=2**18,
+                    ping_interval=20,
+                    ping_timeout=10
+                ) as ws:
+                    logger.info(f"✅ Connected to combined stream for {len(self.active_symbols)} symbols")
+                    self.connection = ws
                     
                     while self.running:
                         try:
-                            message = await asyncio.wait_for(ws.recv(), timeout=30.0)
-                            await self.process_message(symbol, message)
-                        except asyncio.TimeoutError:
-                            # Send ping to keep connection alive
-                            await ws.ping()
+                            # Keepalive pings are sent by the protocol (ping_interval)
+                            message = await ws.recv()
+                            await self.process_message(message)
                         except websockets.exceptions.ConnectionClosed:
-                            logger.warning(f"Connection closed for {symbol}, reconnecting...")
+                            logger.warning("Combined stream connection closed, reconnecting...")
                             break
                         
             except Exception as e:
-                logger.error(f"Error in {symbol} stream: {e}")
+                logger.error(f"Error in combined stream: {e}")
                 self.stats["errors"] += 1
                 await asyncio.sleep(5)  # Wait before reconnecting
+            finally:
+                self.connection = None
+    
+    async def send_request(self, method: str, symbols: list):
+        """Send a SUBSCRIBE/UNSUBSCRIBE request on the live connection"""
+        if self.connection is None:
+            # Not connected; the next reconnect picks up active_symbols
+            return
+        
+        self.request_id += 1
+        request = {
+            "method": method,
+            "params": [f"{s}@trade" for s in symbols],
+            "id": self.request_id
+        }
+        try:
+            await self.connection.send(msgspec.json.encode(request).decode())
+        except Exception as e:
+            logger.error(f"Failed to send {method} for {symbols}: {e}")
+            self.stats["errors"] += 1
     
-    async def process_message(self, symbol: str, message: str):
+    async def process_message(self, message: Union[str, bytes]):
         """Process incoming WebSocket message"""
         try:
-            data = json.loads(message)
+            trade = frame_decoder.decode(message).data
             
             # Binance futures trade stream format
-            if data.get("e") == "trade":
-                tick = self.normalize_tick(data)
+            if trade is not None and trade.e == "trade":
+                tick = self.normalize_tick(trade)
                 self.stats["ticks_received"] += 1
                 
-                # Publish to Redis stream
-                await publish_tick(tick)
-                self.stats["ticks_published"] += 1
+                # Hand off to publish_loop for batched XADD
+                try:
+                    self.publish_queue.put_nowait(tick)
+                except asyncio.QueueFull:
+                    self.stats["ticks_dropped"] += 1
                 
         except Exception as e:
             logger.error(f"Failed to process message: {e}")
             self.stats["errors"] += 1
     
-    def normalize_tick(self, data: dict) -> dict:
+    async def publish_loop(self):
+        """Drain queued ticks and publish them to Redis in pipelined batches"""
+        while True:
+            tick = await self.publish_queue.get()
+            if tick is PUBLISH_STOP:
+                return
+            # Earlier failures go first so stream order is kept
+            batch, self.publish_retry = self.publish_retry, []
+            batch.append(tick)
+            
+            # Top up from whatever is queued, waiting at most one timeout for more
+            stopping = self.drain_queue(batch)
+            if not stopping and len(batch) < settings.PUBLISH_BATCH_SIZE:
+                await asyncio.sleep(settings.PUBLISH_BATCH_TIMEOUT_SECONDS)
+                stopping = self.drain_queue(batch)
+            
+            await self.publish_batch(batch)
+            
+            if stopping:
+                return
+    
+    async def publish_batch(self, batch: List[dict]):
+        """Publish one batch, keeping failed ticks (bounded) for the next one"""
+        failed = await publish_ticks(batch)
+        self.stats["ticks_published"] += len(batch) - len(failed)
+        if not failed:
+            return
+        
+        self.stats["errors"] += 1
+        # Hold at most one batch worth of retries; drop the oldest past that
+        overflow = len(failed) - settings.PUBLISH_BATCH_SIZE
+        if overflow > 0:
+            self.stats["ticks_dropped"] += overflow
+            failed = failed[overflow:]
+        self.publish_retry = failed
+    
+    def drain_queue(self, batch: list) -> bool:
+        """Move queued ticks into batch without blocking, up to the batch size"""
+        # True once the stop marker has been taken off the queue
+        while len(batch) < settings.PUBLISH_BATCH_SIZE and not self.publish_queue.empty():
+            tick = self.publish_queue.get_nowait()
+            if tick is PUBLISH_STOP:
+                return True
+            batch.append(tick)
+        return False
+    
+    def normalize_tick(self, trade: Trade) -> dict:
         """Normalize Binance tick data to standard format"""
         # Binance trade event: {e: 'trade', E: event_time, s: symbol, p: price, q: quantity, T: trade_time}
-        timestamp = datetime.fromtimestamp(data["T"] / 1000)
-        
+        # Keys double as the Redis stream fields, so no further reshaping is needed
         return {
-            "symbol": data["s"].lower(),
-            "time": timestamp.isoformat(),
-            "price": float(data["p"]),
-            "size": float(data["q"])
+            "symbol": trade.s.lower(),
+            "time_ms": trade.T,
+            "price": trade.p,
+            "size": trade.q
         }
     
     async def report_stats(self):
@@ -103,38 +243,110 @@ class WebSocketIngestor:
             logger.info(
                 f"Ingestor Stats - Received: {self.stats['ticks_received']}, "
                 f"Published: {self.stats['ticks_published']}, "
+                f"Dropped: {self.stats['ticks_dropped']}, "
                 f"Errors: {self.stats['errors']}"
             )
     
     async def add_symbol(self, symbol: str):
         """Dynamically add a new symbol to ingest"""
         symbol = symbol.lower()
+        if not self.owns_symbol(symbol):
+            await self.forward_control("add", symbol)
+            return
         if symbol not in self.active_symbols:
             self.active_symbols.add(symbol)
-            asyncio.create_task(self.ingest_symbol(symbol))
+            await self.send_request("SUBSCRIBE", [symbol])
             logger.info(f"Added symbol: {symbol}")
     
     async def remove_symbol(self, symbol: str):
         """Remove a symbol from ingestion"""
         symbol = symbol.lower()
+        if not self.owns_symbol(symbol):
+            await self.forward_control("remove", symbol)
+            return
         if symbol in self.active_symbols:
             self.active_symbols.remove(symbol)
-            if symbol in self.connections:
-                await self.connections[symbol].close()
-                del self.connections[symbol]
+            await self.send_request("UNSUBSCRIBE", [symbol])
             logger.info(f"Removed symbol: {symbol}")
     
+    async def forward_control(self, action: str, symbol: str):
+        """Hand an add/remove request to the worker that owns the symbol"""
+        owner = symbol_worker(symbol, settings.WORKER_COUNT)
+        # Only the owner subscribes, so zero receivers means it never got the request
+        receivers = await publish_to_channel(
+            control_channel(owner), {"action": action, "symbol": symbol}
+        )
+        if not receivers:
+            raise RuntimeError(f"Could not forward {action} of {symbol} to worker {owner}")
+        logger.info(f"Forwarded {action} of {symbol} to worker {owner}")
+    
+    async def control_loop(self):
+        """Apply add/remove requests other workers forward to this one"""
+        while self.running:
+            pubsub = get_redis_client().pubsub()
+            try:
+                await pubsub.subscribe(control_channel(settings.WORKER_ID))
+                while self.running:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message is not None:
+                        await self.apply_control(message["data"])
+            except Exception as e:
+                logger.error(f"Error in control channel: {e}")
+                self.stats["errors"] += 1
+                await asyncio.sleep(1)  # Wait before resubscribing
+            finally:
+                await pubsub.reset()
+    
+    async def apply_control(self, data: Union[str, bytes]):
+        """Apply one request forwarded to this worker's channel"""
+        try:
+            command = msgspec.json.decode(data)
+            symbol = command["symbol"]
+            if command["action"] == "add":
+                await self.add_symbol(symbol)
+            elif command["action"] == "remove":
+                await self.remove_symbol(symbol)
+        except Exception as e:
+            logger.error(f"Invalid control message {data!r}: {e}")
+            self.stats["errors"] += 1
+    
     async def stop(self):
         """Stop all ingestion"""
         self.running = False
-        for ws in self.connections.values():
-            await ws.close()
+        if self.connection is not None:
+            await self.connection.close()
+        
+        # Let publish_loop flush everything still queued, then end it
+        if self.publish_task is not None:
+            try:
+                await asyncio.wait_for(self.drain_publisher(), timeout=5.0)
+            except asyncio.TimeoutError:
+                # Publisher is stuck; end it and publish what it left behind
+                self.publish_task.cancel()
+                batch, self.publish_retry = self.publish_retry, []
+                while not self.publish_queue.empty():
+                    tick = self.publish_queue.get_nowait()
+                    if tick is not PUBLISH_STOP:
+                        batch.append(tick)
+                await self.publish_batch(batch)
+            self.publish_task = None
+            
+            # Nothing left to retry into once stopped
+            self.stats["ticks_dropped"] += len(self.publish_retry)
+            self.publish_retry = []
         logger.info("WebSocket Ingestor stopped")
     
+    async def drain_publisher(self):
+        """Queue the stop marker behind pending ticks and wait for publish_loop to end"""
+        # put() rather than put_nowait(): the queue may be full
+        await self.publish_queue.put(PUBLISH_STOP)
+        await self.publish_task
+    
     def get_stats(self) -> dict:
         """Get current statistics"""
         return {
             **self.stats,
             "active_symbols": list(self.active_symbols),
-            "connections": len(self.connections)
+            "connections": 0 if self.connection is None else 1,
+            "publish_queue": self.publish_queue.qsize()
         }
\ No newline at end of file
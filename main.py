@@ -1,4 +1,7 @@
 import asyncio
+import multiprocessing
+import os
+import socket
 import sys
 from pathlib import Path
 
@@ -8,12 +11,18 @@ sys.path.insert(0, str(Path(__file__).parent / "backend"))
 from backend.core.config import settings
 from backend.core.database import init_db
 from backend.core.redis_client import init_redis
-from backend.services.websocket_ingestor import WebSocketIngestor
+from backend.services.websocket_ingester import WebSocketIngestor
+from backend.services.batch_processor import BatchProcessor
 from backend.services.analytics_engine import AnalyticsEngine
 from backend.api.server import create_app
 import uvicorn
 import logging
 
+try:
+    import uvloop
+except ImportError:  # uvloop is not available on Windows
+    uvloop = None
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
@@ -23,7 +32,10 @@ logger = logging.getLogger(__name__)
 
 async def startup_services():
     """Initialize all services"""
-    logger.info("Starting Quant Analytics Platform...")
+    logger.info(
+        f"Starting Quant Analytics Platform "
+        f"(worker {settings.WORKER_ID + 1}/{settings.WORKER_COUNT})..."
+    )
     
     # Initialize database
     logger.info("Initializing TimescaleDB...")
@@ -38,6 +50,11 @@ async def startup_services():
     ingestor = WebSocketIngestor()
     asyncio.create_task(ingestor.start())
     
+    # Start Batch Processor (workers share one consumer group, so each tick is written once)
+    logger.info("Starting Batch Processor...")
+    batch_processor = BatchProcessor()
+    asyncio.create_task(batch_processor.start())
+    
     # Start Analytics Engine
     logger.info("Starting Analytics Engine...")
     analytics = AnalyticsEngine()
@@ -46,6 +63,22 @@ async def startup_services():
     logger.info("All services started successfully!")
 
 
+def create_server_socket() -> socket.socket:
+    """Bind the API socket; SO_REUSEPORT lets every worker share the port"""
+    # Resolve the host so IPv6 addresses like "::" get an AF_INET6 socket
+    family, socktype, proto, _, sockaddr = socket.getaddrinfo(
+        settings.API_HOST, settings.API_PORT,
+        type=socket.SOCK_STREAM, flags=socket.AI_PASSIVE
+    )[0]
+    sock = socket.socket(family, socktype, proto)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if settings.WORKER_COUNT > 1:
+        # Kernel load-balances incoming connections across the workers
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind(sockaddr)
+    return sock
+
+
 async def main():
     """Main application entry point"""
     try:
@@ -61,7 +94,8 @@ async def main():
             host=settings.API_HOST,
             port=settings.API_PORT,
             log_level="info",
-            access_log=True
+            access_log=True,
+            loop="uvloop" if uvloop else "asyncio"
         )
         server = uvicorn.Server(config)
         
@@ -69,7 +103,7 @@ async def main():
         logger.info(f" Frontend available at http://{settings.API_HOST}:{settings.API_PORT}")
         logger.info("API Docs at http://{settings.API_HOST}:{settings.API_PORT}/docs")
         
-        await server.serve()
+        await server.serve(sockets=[create_server_socket()])
         
     except KeyboardInterrupt:
         logger.info("Shutting down ...")
@@ -78,5 +112,43 @@ async def main():
         sys.exit(1)
 
 
+def run_worker():
+    """Run one worker process with its own event loop"""
+    if uvloop:
+        # libuv event loop for the socket-heavy ingest/Redis/DB paths
+        uvloop.run(main())
+    else:
+        asyncio.run(main())
+
+
+def supervise_workers():
+    """Spawn WORKER_COUNT workers, each owning a partition of the symbols"""
+    ctx = multiprocessing.get_context("spawn")
+    workers = []
+    
+    for worker_id in range(settings.WORKER_COUNT):
+        # Spawned children build their own Settings from the inherited environment
+        os.environ["WORKER_ID"] = str(worker_id)
+        process = ctx.Process(target=run_worker, name=f"worker-{worker_id}")
+        process.start()
+        workers.append(process)
+    
+    logger.info(f"Started {len(workers)} workers")
+    
+    try:
+        for process in workers:
+            process.join()
+    except KeyboardInterrupt:
+        logger.info("Shutting down workers ...")
+        for process in workers:
+            process.terminate()
+        for process in workers:
+            process.join()
+
+
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    # An explicit WORKER_ID means an external supervisor already started us
+    if settings.WORKER_COUNT > 1 and "WORKER_ID" not in os.environ:
+        supervise_workers()
+    else:
+        run_worker()
\ No newline at end of file
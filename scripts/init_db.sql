@@ -9,8 +9,10 @@ CREATE TABLE IF NOT EXISTS ticks (
     PRIMARY KEY (time, symbol)
 );
 
--- Convert to hypertable
-SELECT create_hypertable('ticks', 'time', if_not_exists => TRUE);
+-- Convert to hypertable (hourly chunks keep the hot chunk small at tick rates)
+SELECT create_hypertable('ticks', 'time',
+    chunk_time_interval => INTERVAL '1 hour',
+    if_not_exists => TRUE);
 
 -- Create indexes
 CREATE INDEX IF NOT EXISTS idx_ticks_symbol_time ON ticks (symbol, time DESC);
@@ -120,7 +122,14 @@ SELECT
 FROM ticks
 GROUP BY time_bucket('5 minutes', time), symbol;
 
--- Refresh policies
+-- Real-time aggregation: serve not-yet-materialized buckets straight from ticks
+ALTER MATERIALIZED VIEW ohlcv_1s SET (timescaledb.materialized_only = false);
+ALTER MATERIALIZED VIEW ohlcv_1m SET (timescaledb.materialized_only = false);
+ALTER MATERIALIZED VIEW ohlcv_5m SET (timescaledb.materialized_only = false);
+
+-- Refresh policies (startup re-tunes schedule_interval to max(bucket width, 2 x ALERT_CHECK_INTERVAL))
+-- Keep start_offset/end_offset in sync with OHLCV_VIEWS in backend/core/database.py,
+-- which re-applies them on startup
 SELECT add_continuous_aggregate_policy('ohlcv_1s',
     start_offset => INTERVAL '1 hour',
     end_offset => INTERVAL '1 second',
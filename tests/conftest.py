@@ -0,0 +1,18 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Resolve `backend.*` imports the same way main.py does
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+@pytest.fixture
+def make_ticks():
+    """Factory for consecutive normalized ticks, shaped like the Redis stream entries"""
+    def factory(count: int, symbol: str = "btcusdt", start: int = 0) -> list:
+        return [
+            {"symbol": symbol, "time_ms": 1_700_000_000_000 + start + i, "price": 1.0, "size": 1.0}
+            for i in range(count)
+        ]
+    return factory
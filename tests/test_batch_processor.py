@@ -0,0 +1,148 @@
+import pytest
+
+from backend.core.config import settings
+from backend.services import batch_processor
+from backend.services.batch_processor import BatchProcessor, ROW_OVERHEAD_BYTES, TickBuffer
+
+
+def test_should_flush_on_bytes_before_row_count(make_ticks):
+    processor = BatchProcessor()
+    row_bytes = ROW_OVERHEAD_BYTES + len("btcusdt")
+    rows = settings.MAX_BATCH_BYTES // row_bytes + 1
+    
+    # With the shipped defaults the byte trigger must be reachable on its own
+    assert rows < settings.BATCH_SIZE
+    
+    processor.buffer.extend(make_ticks(rows - 1))
+    assert not processor.should_flush()
+    
+    processor.buffer.extend(make_ticks(1))
+    assert len(processor.buffer) < settings.BATCH_SIZE
+    assert processor.should_flush()
+
+
+@pytest.mark.asyncio
+async def test_oversized_buffer_is_inserted_in_batch_size_chunks(monkeypatch, make_ticks):
+    inserted = []
+    
+    async def fake_bulk_insert_ticks(times_us, symbols, prices, sizes):
+        inserted.append(times_us)
+    
+    monkeypatch.setattr(batch_processor, "bulk_insert_ticks", fake_bulk_insert_ticks)
+    monkeypatch.setattr(settings, "BATCH_SIZE", 10)
+    
+    processor = BatchProcessor()
+    processor.buffer.extend(make_ticks(25))
+    await processor.flush_buffer()
+    await processor.inflight
+    
+    start = make_ticks(1)[0]["time_ms"]
+    assert inserted == [[ms * 1000 for ms in range(start, start + 10)]]
+    assert processor.buffer.times[:len(processor.buffer)].tolist() == list(range(start + 10, start + 25))
+    assert processor.buffer.nbytes == 15 * (ROW_OVERHEAD_BYTES + len("btcusdt"))
+
+
+@pytest.mark.asyncio
+async def test_failed_inserts_keep_the_newest_rows_up_to_the_cap(monkeypatch, make_ticks):
+    async def failing_bulk_insert_ticks(*columns):
+        raise RuntimeError("database unavailable")
+    
+    monkeypatch.setattr(batch_processor, "bulk_insert_ticks", failing_bulk_insert_ticks)
+    monkeypatch.setattr(settings, "BATCH_SIZE", 10)
+    monkeypatch.setattr(settings, "MAX_RETRY_ROWS", 20)
+    
+    processor = BatchProcessor()
+    processor.buffer.extend(make_ticks(25))
+    await processor.flush_buffer()
+    await processor.inflight
+    
+    start = make_ticks(1)[0]["time_ms"]
+    assert processor.buffer.times[:len(processor.buffer)].tolist() == list(range(start + 5, start + 25))
+    assert processor.buffer.nbytes == 20 * (ROW_OVERHEAD_BYTES + len("btcusdt"))
+    assert processor.stats["ticks_dropped"] == 5
+    assert processor.stats["errors"] == 1
+
+
+@pytest.mark.asyncio
+async def test_flush_recycles_the_spare_buffer(monkeypatch, make_ticks):
+    async def fake_bulk_insert_ticks(*columns):
+        pass
+    
+    monkeypatch.setattr(batch_processor, "bulk_insert_ticks", fake_bulk_insert_ticks)
+    
+    processor = BatchProcessor()
+    first, spare = processor.buffer, processor.spare_buffer
+    
+    processor.buffer.extend(make_ticks(3))
+    await processor.flush_buffer()
+    assert processor.buffer is spare
+    await processor.inflight
+    
+    processor.buffer.extend(make_ticks(3))
+    await processor.flush_buffer()
+    assert processor.buffer is first
+    await processor.inflight
+
+
+def test_tick_buffer_reserve_keeps_rows(make_ticks):
+    buffer = TickBuffer(2)
+    buffer.extend(make_ticks(5))
+    
+    assert len(buffer.times) >= 5
+    assert buffer.columns()[0] == [t["time_ms"] * 1000 for t in make_ticks(5)]
+    assert buffer.nbytes == 5 * (ROW_OVERHEAD_BYTES + len("btcusdt"))
+
+
+def test_tick_buffer_prepend_puts_other_rows_first(make_ticks):
+    older, newer = TickBuffer(4), TickBuffer(4)
+    older.extend(make_ticks(3, symbol="ethusdt"))
+    newer.extend(make_ticks(2))
+    
+    newer.prepend(older)
+    
+    times, symbols, _, _ = newer.columns()
+    assert symbols == ["ethusdt"] * 3 + ["btcusdt"] * 2
+    assert times == [t["time_ms"] * 1000 for t in make_ticks(3) + make_ticks(2)]
+    assert newer.nbytes == older.nbytes + 2 * (ROW_OVERHEAD_BYTES + len("btcusdt"))
+
+
+@pytest.mark.asyncio
+async def test_stop_drains_a_backlog_larger_than_batch_size(monkeypatch, make_ticks):
+    inserted = []
+    
+    async def fake_bulk_insert_ticks(times_us, symbols, prices, sizes):
+        inserted.append(len(times_us))
+    
+    monkeypatch.setattr(batch_processor, "bulk_insert_ticks", fake_bulk_insert_ticks)
+    monkeypatch.setattr(settings, "BATCH_SIZE", 10)
+    
+    processor = BatchProcessor()
+    processor.buffer.extend(make_ticks(25))
+    await processor.stop()
+    
+    assert inserted == [10, 10, 5]
+    assert len(processor.buffer) == 0
+    assert processor.stats["ticks_inserted"] == 25
+    assert processor.stats["ticks_dropped"] == 0
+
+
+@pytest.mark.asyncio
+async def test_stop_counts_rows_left_after_a_failed_insert(monkeypatch, make_ticks):
+    calls = []
+    
+    async def failing_second_insert(times_us, symbols, prices, sizes):
+        calls.append(len(times_us))
+        if len(calls) == 2:
+            raise RuntimeError("database unavailable")
+    
+    monkeypatch.setattr(batch_processor, "bulk_insert_ticks", failing_second_insert)
+    monkeypatch.setattr(settings, "BATCH_SIZE", 10)
+    
+    processor = BatchProcessor()
+    processor.buffer.extend(make_ticks(25))
+    await processor.stop()
+    
+    assert calls == [10, 10]
+    assert len(processor.buffer) == 0
+    assert processor.stats["ticks_inserted"] == 10
+    assert processor.stats["ticks_dropped"] == 15
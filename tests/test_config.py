@@ -0,0 +1,16 @@
+import pytest
+from pydantic import ValidationError
+
+from backend.core.config import Settings
+
+
+def test_worker_count_must_be_positive():
+    with pytest.raises(ValidationError):
+        Settings(WORKER_COUNT=0)
+
+
+def test_worker_id_must_be_below_worker_count():
+    with pytest.raises(ValidationError):
+        Settings(WORKER_COUNT=2, WORKER_ID=2)
+    
+    assert Settings(WORKER_COUNT=2, WORKER_ID=1).WORKER_ID == 1
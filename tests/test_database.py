@@ -0,0 +1,91 @@
+import struct
+from contextlib import asynccontextmanager
+
+import asyncpg
+import pytest
+
+from backend.core import database
+from backend.core.database import (
+    COPY_BINARY_HEADER,
+    COPY_BINARY_TRAILER,
+    PG_EPOCH_OFFSET_US,
+    encode_ticks_copy_binary,
+)
+
+
+def decode_copy_binary(payload) -> list:
+    """Minimal binary COPY reader for (int8, text, float8, float8) rows"""
+    assert payload[:len(COPY_BINARY_HEADER)] == COPY_BINARY_HEADER
+    offset = len(COPY_BINARY_HEADER)
+    rows = []
+    while True:
+        (field_count,) = struct.unpack_from(">h", payload, offset)
+        offset += 2
+        if field_count == -1:
+            break
+        assert field_count == 4
+        fields = []
+        for fmt in ("q", None, "d", "d"):
+            (length,) = struct.unpack_from(">i", payload, offset)
+            offset += 4
+            raw = bytes(payload[offset:offset + length])
+            offset += length
+            fields.append(raw.decode() if fmt is None else struct.unpack(f">{fmt}", raw)[0])
+        rows.append(tuple(fields))
+    assert offset == len(payload)
+    return rows
+
+
+def test_copy_binary_payload_round_trips():
+    times_us = [1_700_000_000_000_000, 1_700_000_000_001_000, 1_700_000_000_002_500]
+    symbols = ["btcusdt", "ethusdt", "1000shibusdt"]
+    prices = [43000.5, 2250.25, 0.0091]
+    sizes = [0.001, 1.5, 12000.0]
+    
+    payload = encode_ticks_copy_binary(times_us, symbols, prices, sizes)
+    
+    assert isinstance(payload, bytearray)
+    assert payload.endswith(COPY_BINARY_TRAILER)
+    assert decode_copy_binary(payload) == [
+        (us - PG_EPOCH_OFFSET_US, symbol, price, size)
+        for us, symbol, price, size in zip(times_us, symbols, prices, sizes)
+    ]
+
+
+def test_copy_binary_payload_for_no_rows_is_header_and_trailer():
+    assert encode_ticks_copy_binary([], [], [], []) == COPY_BINARY_HEADER + COPY_BINARY_TRAILER
+
+
+class MissingViewConnection:
+    """Stands in for a pooled connection whose aggregate views do not exist"""
+    
+    def __init__(self):
+        self.statements = []
+    
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+    
+    async def execute(self, query, *args):
+        self.statements.append(args[0])
+        raise asyncpg.UndefinedTableError(f'relation "{args[0]}" does not exist')
+
+
+class FakePool:
+    def __init__(self, conn):
+        self.conn = conn
+    
+    @asynccontextmanager
+    async def acquire(self):
+        yield self.conn
+
+
+@pytest.mark.asyncio
+async def test_aggregate_policy_errors_do_not_fail_startup(monkeypatch):
+    conn = MissingViewConnection()
+    monkeypatch.setattr(database, "pg_pool", FakePool(conn))
+    
+    await database.configure_aggregate_policies()
+    
+    # Every view is attempted even though each one fails
+    assert conn.statements == [view for view, _, _ in database.OHLCV_VIEWS.values()]
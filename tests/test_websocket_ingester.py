@@ -0,0 +1,144 @@
+import asyncio
+
+import pytest
+
+from backend.core.config import settings
+from backend.services import websocket_ingester
+from backend.services.websocket_ingester import WebSocketIngestor
+
+
+@pytest.mark.asyncio
+async def test_stop_flushes_queued_ticks_and_ends_publish_loop(monkeypatch, make_ticks):
+    published = []
+    
+    async def fake_publish_ticks(ticks):
+        published.extend(ticks)
+        return []
+    
+    monkeypatch.setattr(websocket_ingester, "publish_ticks", fake_publish_ticks)
+    
+    ingestor = WebSocketIngestor()
+    ingestor.running = True
+    ingestor.publish_task = asyncio.create_task(ingestor.publish_loop())
+    await asyncio.sleep(0)
+    
+    ticks = make_ticks(450)
+    for tick in ticks:
+        ingestor.publish_queue.put_nowait(tick)
+    await ingestor.stop()
+    
+    assert published == ticks
+    assert ingestor.publish_queue.empty()
+    assert ingestor.publish_task is None
+    assert ingestor.stats["ticks_published"] == 450
+
+
+@pytest.mark.asyncio
+async def test_failed_ticks_are_retried_ahead_of_the_next_batch(monkeypatch, make_ticks):
+    attempts = []
+    
+    async def flaky_publish_ticks(ticks):
+        attempts.append(ticks)
+        # First call: every other tick fails in the pipeline
+        return ticks[1::2] if len(attempts) == 1 else []
+    
+    monkeypatch.setattr(websocket_ingester, "publish_ticks", flaky_publish_ticks)
+    ticks = make_ticks(5)
+    
+    ingestor = WebSocketIngestor()
+    await ingestor.publish_batch(ticks[:4])
+    assert ingestor.publish_retry == [ticks[1], ticks[3]]
+    
+    ingestor.publish_task = asyncio.create_task(ingestor.publish_loop())
+    ingestor.publish_queue.put_nowait(ticks[4])
+    await ingestor.stop()
+    
+    assert attempts[1] == [ticks[1], ticks[3], ticks[4]]
+    assert ingestor.stats["ticks_published"] == 5
+    assert ingestor.stats["ticks_dropped"] == 0
+    assert ingestor.stats["errors"] == 1
+
+
+@pytest.mark.asyncio
+async def test_symbol_requests_are_forwarded_to_the_owning_worker(monkeypatch):
+    forwarded = []
+    
+    async def fake_publish_to_channel(channel, message):
+        forwarded.append((channel, message))
+        return 1
+    
+    monkeypatch.setattr(websocket_ingester, "publish_to_channel", fake_publish_to_channel)
+    monkeypatch.setattr(settings, "WORKER_COUNT", 2)
+    monkeypatch.setattr(settings, "WORKER_ID", 0)
+    
+    # btcusdt hashes to worker 1, solusdt to worker 0
+    ingestor = WebSocketIngestor()
+    await ingestor.add_symbol("BTCUSDT")
+    
+    # A request arriving on this worker's own channel is applied locally
+    await ingestor.apply_control('{"action": "add", "symbol": "solusdt"}')
+    
+    assert forwarded == [
+        (f"{settings.REDIS_CONTROL_CHANNEL}:1", {"action": "add", "symbol": "btcusdt"})
+    ]
+    assert "btcusdt" not in ingestor.active_symbols
+    assert "solusdt" in ingestor.active_symbols
+
+
+@pytest.mark.asyncio
+async def test_forwarding_without_listeners_fails_loudly(monkeypatch):
+    async def no_receivers(channel, message):
+        return 0
+    
+    monkeypatch.setattr(websocket_ingester, "publish_to_channel", no_receivers)
+    monkeypatch.setattr(settings, "WORKER_COUNT", 2)
+    monkeypatch.setattr(settings, "WORKER_ID", 0)
+    
+    with pytest.raises(RuntimeError):
+        await WebSocketIngestor().add_symbol("btcusdt")
+
+
+@pytest.mark.asyncio
+async def test_ticks_past_the_queue_bound_are_dropped_and_counted(monkeypatch):
+    monkeypatch.setattr(settings, "PUBLISH_QUEUE_MAXSIZE", 3)
+    frame = b'{"stream":"btcusdt@trade","data":{"e":"trade","T":1700000000000,"s":"BTCUSDT","p":"1.0","q":"1.0"}}'
+    
+    ingestor = WebSocketIngestor()
+    for _ in range(5):
+        await ingestor.process_message(frame)
+    
+    assert ingestor.publish_queue.qsize() == 3
+    assert ingestor.stats["ticks_received"] == 5
+    assert ingestor.stats["ticks_dropped"] == 2
+    assert ingestor.stats["errors"] == 0
+
+
+def test_frame_decoder_parses_quoted_decimals():
+    frame = (
+        b'{"stream":"btcusdt@trade","data":{"e":"trade","E":1700000000005,"T":1700000000001,'
+        b'"s":"BTCUSDT","t":4123456789,"p":"43000.10","q":"0.002","X":"MARKET","m":true}}'
+    )
+    
+    trade = websocket_ingester.frame_decoder.decode(frame).data
+    
+    assert WebSocketIngestor().normalize_tick(trade) == {
+        "symbol": "btcusdt",
+        "time_ms": 1_700_000_000_001,
+        "price": 43000.10,
+        "size": 0.002,
+    }
+
+
+def test_subscription_replies_decode_without_a_trade():
+    assert websocket_ingester.frame_decoder.decode(b'{"result":null,"id":1}').data is None
+
+
+@pytest.mark.asyncio
+async def test_malformed_trade_frames_are_counted_as_errors():
+    frame = b'{"stream":"btcusdt@trade","data":{"e":"trade","s":"BTCUSDT","p":"1.0","q":"1.0"}}'
+    
+    ingestor = WebSocketIngestor()
+    await ingestor.process_message(frame)
+    
+    assert ingestor.publish_queue.empty()
+    assert ingestor.stats["errors"] == 1